@@ -1,4 +1,5 @@
 import sqlite3
+import threading
 
 def dict_factory(cursor, row):
     d = {}
@@ -8,34 +9,42 @@ def dict_factory(cursor, row):
 
 class SquirrelDB:
 
-    def __init__(self):
-        self.connection = sqlite3.connect("squirrel_db.db")
+    def __init__(self, filename="squirrel_db.db"):
+        # The connection is shared by the server's worker threads, so every use
+        # of it (and of the shared cursor) is serialized through self.lock.
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
         self.connection.row_factory = dict_factory
         self.cursor = self.connection.cursor()
+        self.lock = threading.Lock()
 
     def getSquirrels(self):
-        self.cursor.execute("SELECT * FROM squirrels ORDER BY id")
-        return self.cursor.fetchall()
+        with self.lock:
+            self.cursor.execute("SELECT * FROM squirrels ORDER BY id")
+            return self.cursor.fetchall()
 
     def getSquirrel(self, squirrelId):
         data = [squirrelId]
-        self.cursor.execute("SELECT * FROM squirrels WHERE id = ?", data)
-        return self.cursor.fetchone()
+        with self.lock:
+            self.cursor.execute("SELECT * FROM squirrels WHERE id = ?", data)
+            return self.cursor.fetchone()
 
     def createSquirrel(self, name, size):
         data = [name, size]
-        self.cursor.execute("INSERT INTO squirrels (name, size) VALUES (?, ?)", data)
-        self.connection.commit()
-        return None
+        with self.lock:
+            self.cursor.execute("INSERT INTO squirrels (name, size) VALUES (?, ?)", data)
+            self.connection.commit()
+            return self.cursor.lastrowid
 
     def updateSquirrel(self, squirrelId, name, size):
         data = [name, size, squirrelId]
-        self.cursor.execute("UPDATE squirrels SET name = ?, size = ? WHERE id = ?", data)
-        self.connection.commit()
-        return None
+        with self.lock:
+            self.cursor.execute("UPDATE squirrels SET name = ?, size = ? WHERE id = ?", data)
+            self.connection.commit()
+            return self.cursor.rowcount
 
     def deleteSquirrel(self, squirrelId):
         data = [squirrelId]
-        self.cursor.execute("DELETE FROM squirrels WHERE id = ?", data)
-        self.connection.commit()
-        return None
+        with self.lock:
+            self.cursor.execute("DELETE FROM squirrels WHERE id = ?", data)
+            self.connection.commit()
+            return self.cursor.rowcount
@@ -1,135 +1,244 @@
+import functools
 import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import parse_qs
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
 from squirrel_db import SquirrelDB
 
+try:
+    # orjson serializes straight to bytes and is much faster than json.dumps.
+    from orjson import dumps as _dump_json
+except ImportError:
+    def _dump_json(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# Fixed bodies for the plain-text error responses.
+BAD_REQUEST_BODY = b"400 Bad Request"
+NOT_FOUND_BODY = b"404 Not Found"
+METHOD_NOT_ALLOWED_BODY = b"405 Method Not Allowed"
+MISSING_FIELDS_BODY = b"Missing or empty 'name' or 'size'"
+CREATE_FAILED_BODY = b"Could not create squirrel with provided data"
+UPDATE_FAILED_BODY = b"Could not update squirrel with provided data"
+
+# An empty table always serializes to the same bytes.
+EMPTY_LIST_BODY = b"[]"
+
+# Where to listen and which database file to serve. The defaults match the
+# course setup; the environment overrides let several servers run side by
+# side (e.g. one per parallel test worker).
+SERVER_PORT = int(os.environ.get("SQUIRREL_PORT", "8080"))
+DB_FILE = os.environ.get("SQUIRREL_DB", "squirrel_db.db")
+
+# Request bodies larger than this are rejected without being read.
+MAX_BODY = 1 << 16
+
+# One SquirrelDB (and SQLite connection) shared by every request, opened on
+# first use rather than at import time.
+_db = None
+_db_lock = threading.Lock()
+
+
+def _get_db():
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = SquirrelDB(DB_FILE)
+    return _db
+
+
+@functools.lru_cache(maxsize=2048)
+def parse_path(path):
+    """
+    Split request paths like:
+      /squirrels          -> ("squirrels", None)
+      /squirrels/123      -> ("squirrels", "123")
+      /squirrels?a=b      -> ("squirrels", None)
+      /                   -> ("", None)
+
+    Uses str.partition so no intermediate list is built per request.
+    Clients hit a small set of paths over and over, so results are cached;
+    the result tuples are immutable and safe to share between threads.
+    """
+    path, _, _ = path.partition("?")
+    head, _, rest = path.partition("/")
+    if head:
+        # Not an absolute path.
+        return ("", None)
+    resourceName, _, rest = rest.partition("/")
+    resourceId, _, _ = rest.partition("/")
+    return (resourceName, resourceId or None)
+
 
 class SquirrelServerHandler(BaseHTTPRequestHandler):
+    # Buffer wfile so the status line, headers and body of a response go out
+    # in one write when the request finishes, instead of one per call.
+    wbufsize = -1
+
+    # Speak HTTP/1.1 so clients can keep one connection open across requests.
+    # Idle keep-alive connections are dropped after this many seconds.
+    protocol_version = "HTTP/1.1"
+    timeout = 60
+
+    # Maps (HTTP method, id present in path) to the action for /squirrels.
+    # Combinations missing here (POST with an id, PUT or DELETE without one)
+    # are invalid for this API and get a 404.
+    ROUTES = {
+        ("GET", False): "handleSquirrelsIndex",
+        ("GET", True): "handleSquirrelsRetrieve",
+        ("POST", False): "handleSquirrelsCreate",
+        ("PUT", True): "handleSquirrelsUpdate",
+        ("DELETE", True): "handleSquirrelsDelete",
+    }
+
     # HTTP METHODS
 
-    def do_GET(self):
+    def dispatch(self):
+        self.requestBody = self.readRequestBody()
         resourceName, resourceId = self.parsePath()
+        action = None
         if resourceName == "squirrels":
-            if resourceId:
-                self.handleSquirrelsRetrieve(resourceId)
-            else:
-                self.handleSquirrelsIndex()
-        else:
+            action = self.ROUTES.get((self.command, resourceId is not None))
+        if action is None:
             self.handle404()
-
-    def do_POST(self):
-        resourceName, resourceId = self.parsePath()
-        if resourceName == "squirrels":
-            if resourceId:
-                # POST with an id in the path is not allowed for this resource.
-                self.handle404()
-            else:
-                self.handleSquirrelsCreate()
+        elif resourceId is None:
+            getattr(self, action)()
         else:
-            self.handle404()
+            getattr(self, action)(resourceId)
 
-    def do_PUT(self):
-        resourceName, resourceId = self.parsePath()
-        if resourceName == "squirrels":
-            if resourceId:
-                self.handleSquirrelsUpdate(resourceId)
-            else:
-                # PUT without an id is invalid for this API.
-                self.handle404()
-        else:
-            self.handle404()
-
-    def do_DELETE(self):
-        resourceName, resourceId = self.parsePath()
-        if resourceName == "squirrels":
-            if resourceId:
-                self.handleSquirrelsDelete(resourceId)
-            else:
-                # DELETE without an id is invalid for this API.
-                self.handle404()
-        else:
-            self.handle404()
+    do_GET = do_POST = do_PUT = do_DELETE = dispatch
 
     def do_PATCH(self):
         """
         PATCH is not supported by this API. Explicitly return 405 instead of
         the default 501 from BaseHTTPRequestHandler.
         """
-        self.send_response(405)
-        self.send_header("Content-Type", "text/plain")
-        self.end_headers()
-        self.wfile.write(b"405 Method Not Allowed")
+        self.readRequestBody()
+        self.sendBody(405, METHOD_NOT_ALLOWED_BODY)
+
+    def handle_expect_100(self):
+        """
+        Answer "Expect: 100-continue" straight away. wfile is buffered, so
+        without the flush the interim response would sit in the buffer until
+        the final one, and the client would be left waiting to send the body.
+
+        A body that readRequestBody would refuse is rejected with 400 up
+        front instead, so the client does not upload it for nothing.
+        """
+        if self.requestBodyLength() is None:
+            self.close_connection = True
+            self.handle400()
+            return False
+        result = super().handle_expect_100()
+        self.wfile.flush()
+        return result
 
     # HELPERS
 
+    def readRequestBody(self):
+        """
+        Read the raw request body so the connection is ready for the next
+        request, whether or not the action needs the body.
+
+        Returns the body bytes, or None if there is no usable body. A body
+        that cannot be consumed (bad Content-Length, larger than MAX_BODY,
+        chunked) would be mistaken for the next request on a keep-alive
+        connection, so the connection is closed after the response instead.
+        """
+        length = self.requestBodyLength()
+        if length is None:
+            self.close_connection = True
+            return None
+        if length == 0:
+            return None
+
+        try:
+            return self.rfile.read(length)
+        except OSError:
+            self.close_connection = True
+            return None
+
+    def requestBodyLength(self):
+        """
+        Return the length of the request body (0 if there is none), or None
+        if it cannot be consumed: a bad Content-Length, one larger than
+        MAX_BODY, or a chunked body.
+        """
+        length_header = self.headers.get("Content-Length")
+        if not length_header:
+            return None if self.headers.get("Transfer-Encoding") else 0
+
+        try:
+            length = int(length_header)
+        except ValueError:
+            # Invalid Content-Length
+            return None
+
+        if length < 0 or length > MAX_BODY:
+            # Unreadable, or too much to buffer in memory.
+            return None
+        return length
+
     def getRequestData(self):
         """
-        Read and parse the request body as URL-encoded form data.
+        Parse the request body as URL-encoded form data.
 
         Returns a dict of single string values:
             {"name": "...", "size": "...", ...}
 
-        If the body cannot be parsed, returns an empty dict.
+        If there is no usable body or it cannot be parsed, returns an empty
+        dict.
         """
-        try:
-            length_header = self.headers.get("Content-Length")
-            if not length_header:
-                return {}
-            length = int(length_header)
-        except (TypeError, ValueError):
-            # Missing or invalid Content-Length
+        if not self.requestBody:
             return {}
 
+        # parse_qsl yields (key, value) pairs, so no per-key lists are built.
+        # Blank values are kept; the handlers reject empty fields themselves.
+        # Both the raw body and its percent-escapes must be valid UTF-8, so
+        # no replacement characters end up in the database.
         try:
-            body = self.rfile.read(length).decode("utf-8")
-        except Exception:
+            body = self.requestBody.decode("utf-8")
+            return dict(parse_qsl(body, keep_blank_values=True, errors="strict"))
+        except UnicodeDecodeError:
             return {}
 
-        data = parse_qs(body)
-        # Convert {"key": ["val", ...]} to {"key": "val"}
-        return {key: vals[0] for key, vals in data.items()}
-
     def parsePath(self):
-        """
-        Split paths like:
-          /squirrels          -> ("squirrels", None)
-          /squirrels/123      -> ("squirrels", "123")
-          /                   -> ("", None)
-        """
-        if self.path.startswith("/"):
-            parts = self.path[1:].split("/")
-            resourceName = parts[0] if parts[0] else ""
-            resourceId = None
-            if len(parts) > 1 and parts[1]:
-                resourceId = parts[1]
-            return (resourceName, resourceId)
-        return ("", None)
-
-    def handle400(self, message="400 Bad Request"):
-        """Send a simple 400 response with a plain-text message."""
-        self.send_response(400)
-        self.send_header("Content-Type", "text/plain")
+        """Split self.path into (resourceName, resourceId); see parse_path."""
+        return parse_path(self.path)
+
+    def startResponse(self, status):
+        """Send the status line, and tell the client if we are hanging up."""
+        self.send_response(status)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+
+    def sendBody(self, status, body, contentType="text/plain"):
+        """Send a complete response with the given bytes as its body."""
+        self.startResponse(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(message.encode("utf-8"))
+        self.wfile.write(body)
+
+    def handle400(self, message=BAD_REQUEST_BODY):
+        """Send a simple 400 response with a plain-text bytes message."""
+        self.sendBody(400, message)
 
     # ACTIONS
 
     def handleSquirrelsIndex(self):
-        db = SquirrelDB()
+        db = _get_db()
+        # Serialized once to bytes, so Content-Length is known before sending.
         squirrelsList = db.getSquirrels()
-        self.send_response(200)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(squirrelsList).encode("utf-8"))
+        payload = _dump_json(squirrelsList) if squirrelsList else EMPTY_LIST_BODY
+        self.sendBody(200, payload, "application/json")
 
     def handleSquirrelsRetrieve(self, squirrelId):
-        db = SquirrelDB()
+        db = _get_db()
         squirrel = db.getSquirrel(squirrelId)
         if squirrel:
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps(squirrel).encode("utf-8"))
+            self.sendBody(200, _dump_json(squirrel), "application/json")
         else:
             self.handle404()
 
@@ -141,10 +250,11 @@ class SquirrelServerHandler(BaseHTTPRequestHandler):
           - name (non-empty)
           - size (non-empty)
 
-        On success: 201 Created with empty body.
+        On success: 201 Created with empty body and a Location header
+        pointing at the new record.
         On bad input: 400 Bad Request (tests expect server not to crash).
         """
-        db = SquirrelDB()
+        db = _get_db()
         body = self.getRequestData()
 
         name = body.get("name")
@@ -152,18 +262,20 @@ class SquirrelServerHandler(BaseHTTPRequestHandler):
 
         # Validate required fields: must both be present and non-empty.
         if not name or not size:
-            self.handle400("Missing or empty 'name' or 'size'")
+            self.handle400(MISSING_FIELDS_BODY)
             return
 
         try:
-            db.createSquirrel(name, size)
+            squirrelId = db.createSquirrel(name, size)
         except Exception:
             # Any unexpected error while creating is treated as bad request here
             # rather than crashing the connection.
-            self.handle400("Could not create squirrel with provided data")
+            self.handle400(CREATE_FAILED_BODY)
             return
 
-        self.send_response(201)
+        self.startResponse(201)
+        self.send_header("Location", f"/squirrels/{squirrelId}")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     def handleSquirrelsUpdate(self, squirrelId):
@@ -175,55 +287,57 @@ class SquirrelServerHandler(BaseHTTPRequestHandler):
           - size (non-empty)
 
         On success: 204 No Content.
+        On bad input: 400 Bad Request (checked before the record is looked up).
         On missing record: 404.
-        On bad input: 400 Bad Request.
         """
-        db = SquirrelDB()
-        squirrel = db.getSquirrel(squirrelId)
-        if not squirrel:
-            self.handle404()
-            return
-
+        db = _get_db()
         body = self.getRequestData()
         name = body.get("name")
         size = body.get("size")
 
         # Validate required fields: must both be present and non-empty.
         if not name or not size:
-            self.handle400("Missing or empty 'name' or 'size'")
+            self.handle400(MISSING_FIELDS_BODY)
             return
 
         try:
-            db.updateSquirrel(squirrelId, name, size)
+            updated = db.updateSquirrel(squirrelId, name, size)
         except Exception:
             # Treat unexpected update errors as bad inputs for this assignment.
-            self.handle400("Could not update squirrel with provided data")
+            self.handle400(UPDATE_FAILED_BODY)
+            return
+
+        # The UPDATE itself tells us whether the record exists.
+        if not updated:
+            self.handle404()
             return
 
-        self.send_response(204)
+        self.startResponse(204)
         self.end_headers()
 
     def handleSquirrelsDelete(self, squirrelId):
-        db = SquirrelDB()
-        squirrel = db.getSquirrel(squirrelId)
-        if squirrel:
-            db.deleteSquirrel(squirrelId)
-            self.send_response(204)
+        db = _get_db()
+        if db.deleteSquirrel(squirrelId):
+            self.startResponse(204)
             self.end_headers()
         else:
             self.handle404()
 
     def handle404(self):
-        self.send_response(404)
-        self.send_header("Content-Type", "text/plain")
-        self.end_headers()
-        self.wfile.write(b"404 Not Found")
+        self.sendBody(404, NOT_FOUND_BODY)
+
+
+class SquirrelServer(ThreadingHTTPServer):
+    # One thread per connection so a slow client does not block the others.
+    # socketserver's default listen backlog of 5 refuses connections when a
+    # burst of clients connects at once; allow a deeper queue.
+    request_queue_size = 128
 
 
 def run():
-    print("squirrel_server running at 127.0.0.1:8080")
-    listen = ("127.0.0.1", 8080)
-    server = HTTPServer(listen, SquirrelServerHandler)
+    print(f"squirrel_server running at 127.0.0.1:{SERVER_PORT}")
+    listen = ("127.0.0.1", SERVER_PORT)
+    server = SquirrelServer(listen, SquirrelServerHandler)
     server.serve_forever()
 
 
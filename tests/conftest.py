@@ -1,39 +1,83 @@
+import os
 import sys
-import shutil
 import signal
+import socket
+import sqlite3
 import subprocess
 import time
 from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 import requests
+import requests.models
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    _stdlib_json = requests.models.complexjson
+
+    def _loads(s, **kwargs):
+        # orjson takes no options; calls that pass any keep the stdlib path.
+        if kwargs:
+            return _stdlib_json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    # Response.json() decodes through requests.models.complexjson. Only loads
+    # is swapped: requests also calls complexjson.dumps(..., allow_nan=False)
+    # to encode json= request bodies, which orjson.dumps does not accept.
+    # orjson's JSONDecodeError subclasses json's, so requests still wraps
+    # decode failures in requests.JSONDecodeError.
+    requests.models.complexjson = SimpleNamespace(
+        loads=_loads, dumps=_stdlib_json.dumps
+    )
 
 # Ensure project root (where mydb.py, squirrel_server.py live) is on sys.path
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+# Under pytest-xdist each worker ("gw0", "gw1", ...) gets its own DB file and
+# server port, so workers never share state. Without xdist this is None and
+# the course defaults are used.
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER")
+
 # File paths / config
 DB_TEMPLATE = ROOT / "empty_squirrel_db.db"   # clean template provided by the course
-DB_FILE = ROOT / "squirrel_db.db"
 SERVER_HOST = "127.0.0.1"
-SERVER_PORT = 8080
+if WORKER_ID is None:
+    DB_FILE = ROOT / "squirrel_db.db"
+    SERVER_PORT = 8080
+else:
+    DB_FILE = ROOT / f"squirrel_db_{WORKER_ID}.db"
+    # Start above 8080 so a worker never picks up a manually started server.
+    SERVER_PORT = 8081 + int(WORKER_ID[2:])
 BASE_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
 
 
+# Set once a probe succeeds, so later probes skip the socket round-trip.
+_server_seen = False
+
+
 def _server_responds(timeout: float = 0.5) -> bool:
     """
-    Return True if something is already listening on BASE_URL.
+    Return True if something is already listening on SERVER_HOST:SERVER_PORT.
 
-    We treat *any* HTTP response from /squirrels as "server is up",
-    even if it's 500 or some unexpected status.
+    A plain TCP connect is enough to tell the port is open; there is no need
+    for a full HTTP request. Once the server has been seen the result is
+    remembered for the rest of the session.
     """
-    try:
-        r = requests.get(f"{BASE_URL}/squirrels", timeout=timeout)
-        # If we got *any* response, the socket is open and a server is running.
+    global _server_seen
+    if _server_seen:
         return True
-    except requests.RequestException:
-        return False
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        _server_seen = s.connect_ex((SERVER_HOST, SERVER_PORT)) == 0
+    return _server_seen
 
 
 def _wait_for_server(timeout: float = 5.0) -> bool:
@@ -58,17 +102,26 @@ def server_process():
     reuse that and DO NOT start/stop our own process.
 
     If not, start our own squirrel_server.py and tear it down at the end.
+
+    Either way the runtime DB starts the session as a copy of the template.
+    It is rewritten in place, not swapped with os.replace(), so a server
+    that already has it open keeps seeing the same file.
     """
+    assert DB_TEMPLATE.exists(), f"Missing template DB: {DB_TEMPLATE}"
+    DB_FILE.write_bytes(DB_TEMPLATE.read_bytes())
+
     # Case 1: something is already serving on BASE_URL – just use it.
     if _server_responds(timeout=0.5):
         # Yield a dummy value; we are not responsible for stopping this server.
         yield None
         return
 
-    # Case 2: no server yet; start our own process.
+    # Case 2: no server yet; start our own process on this worker's port/DB.
+    env = dict(os.environ, SQUIRREL_PORT=str(SERVER_PORT), SQUIRREL_DB=str(DB_FILE))
     proc = subprocess.Popen(
         [sys.executable, "-u", str(ROOT / "squirrel_server.py")],
         cwd=str(ROOT),
+        env=env,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
@@ -96,15 +149,35 @@ def server_process():
         except subprocess.TimeoutExpired:
             proc.kill()
 
+    # Per-worker DB files are scratch copies; the course DB file is kept.
+    if WORKER_ID is not None:
+        DB_FILE.unlink(missing_ok=True)
+
+
+@pytest.fixture(scope="session")
+def db_connection(server_process):
+    """
+    A connection to the runtime DB held for the whole session, used to
+    reset it between tests. Closed before the server (and any per-worker
+    DB file) is torn down.
+    """
+    connection = sqlite3.connect(DB_FILE)
+    yield connection
+    connection.close()
+
 
 @pytest.fixture(autouse=True)
-def reset_db():
+def reset_db(db_connection):
     """
-    Before each test, reset the runtime DB to the pristine template
-    to ensure isolation.
+    Before each test, empty the squirrels table to ensure isolation.
+
+    One DELETE through an open connection is cheaper than rewriting the
+    whole file, and the server picks up the change on its next query. The
+    table has no AUTOINCREMENT, so ids start again from 1 just as on a
+    fresh copy of the template.
     """
-    assert DB_TEMPLATE.exists(), f"Missing template DB: {DB_TEMPLATE}"
-    shutil.copyfile(DB_TEMPLATE, DB_FILE)
+    db_connection.execute("DELETE FROM squirrels")
+    db_connection.commit()
     yield
     # Optionally keep DB_FILE for post-test inspection
 
@@ -113,3 +186,64 @@ def reset_db():
 def base_url():
     """Base URL for all API calls."""
     return BASE_URL
+
+
+@pytest.fixture(scope="session")
+def squirrels_url(base_url):
+    """URL of the squirrels collection, joined once for the whole session."""
+    return f"{base_url}/squirrels"
+
+
+@pytest.fixture(scope="session")
+def http():
+    """
+    One requests.Session for the whole run, so calls reuse a keep-alive
+    connection instead of opening a new TCP connection each time.
+    """
+    session = requests.Session()
+    # The server is always local: skip the per-request proxy environment and
+    # ~/.netrc lookups that requests otherwise performs.
+    session.trust_env = False
+    # Every test talks to one host, so one small pool is enough. Nothing is
+    # retried: urllib3 already discards pooled connections the server has
+    # closed, so any error is a real failure and should fail the test at once.
+    retry = Retry(total=0, connect=0, read=0, redirect=0)
+    session.mount(
+        "http://",
+        HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry),
+    )
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def create_squirrel(http, squirrels_url):
+    """
+    Return a function that creates a squirrel and returns its id.
+
+    The id comes from the Location header of the 201 response, so no extra
+    GET is needed. A server that does not send Location (e.g. an older one
+    started by hand) falls back to the highest id in the index. A failed
+    create fails the test here rather than yielding a wrong id.
+    """
+    def create(name, size):
+        r = http.post(squirrels_url, data={"name": name, "size": size})
+        assert r.status_code == 201
+        location = r.headers.get("Location")
+        if location:
+            return int(location.rsplit("/", 1)[-1])
+        return http.get(squirrels_url).json()[-1]["id"]
+
+    return create
+
+
+@pytest.fixture
+def seeded_squirrel(reset_db, create_squirrel):
+    """
+    One freshly created squirrel, as {"id": ..., "name": ..., "size": ...}.
+
+    Depends on reset_db explicitly so the record is created after the table
+    has been emptied.
+    """
+    name, size = "Fixture", "medium"
+    return {"id": create_squirrel(name, size), "name": name, "size": size}
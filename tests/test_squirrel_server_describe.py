@@ -1,285 +1,308 @@
-import requests
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
 import pytest
+from requests.exceptions import RequestException
+
+# The server rejects bad input at once on localhost; a request that takes
+# longer than this has already failed.
+_FAIL_TIMEOUT = 0.25
+
+
+def create_many(http, squirrels_url, names):
+    """POST one squirrel per name, concurrently over the session's pool."""
+    def create(name):
+        r = http.post(squirrels_url, data={"name": name, "size": "s"})
+        assert r.status_code in (200, 201)
+
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        list(pool.map(create, names))
+
+
+def expect_continue(base_url, length):
+    """
+    Open a raw socket and send the headers of a form POST to /squirrels with
+    "Expect: 100-continue", leaving the body for the caller to send.
+    """
+    host, _, port = urlsplit(base_url).netloc.partition(":")
+    head = (
+        "POST /squirrels HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        "Content-Type: application/x-www-form-urlencoded\r\n"
+        f"Content-Length: {length}\r\n"
+        "Expect: 100-continue\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    )
+    sock = socket.create_connection((host, int(port)), timeout=1)
+    sock.sendall(head.encode("ascii"))
+    return sock
 
 
 def describe_squirrel_api():
+    # Tests run in file order: read-mostly 404 checks first, then writes, and
+    # the bad-input tests (which may cost a dropped connection) last.
+
+    # ---------------- Ten+ distinct 404 (failure) conditions ----------------
+
+    @pytest.mark.parametrize(
+        "method,path,data",
+        [
+            # Non-existent root path
+            pytest.param("GET", "/", None, id="unknown_root"),
+            # Unknown resource segment
+            pytest.param("GET", "/not-squirrels", None, id="unknown_resource"),
+            # Numeric id that does not exist
+            pytest.param(
+                "GET", "/squirrels/999999", None,
+                id="retrieve_nonexistent_numeric_id",
+            ),
+            # Non-numeric id is treated as not found
+            pytest.param(
+                "GET", "/squirrels/abc", None, id="retrieve_non_numeric_id"
+            ),
+            # POST with an id in the path is invalid for this API
+            pytest.param(
+                "POST", "/squirrels/123", {"name": "X", "size": "Y"},
+                id="post_with_id_in_path",
+            ),
+            # PUT requires an id path segment
+            pytest.param(
+                "PUT", "/squirrels", {"name": "X", "size": "Y"},
+                id="put_without_id",
+            ),
+            # DELETE requires an id path segment
+            pytest.param("DELETE", "/squirrels", None, id="delete_without_id"),
+            # Updating a missing id
+            pytest.param(
+                "PUT", "/squirrels/424242", {"name": "Nope", "size": "Nope"},
+                id="put_nonexistent_id",
+            ),
+            # Deleting a missing id
+            pytest.param(
+                "DELETE", "/squirrels/424242", None, id="delete_nonexistent_id"
+            ),
+            # Common stray path
+            pytest.param("GET", "/favicon.ico", None, id="favicon"),
+            # Non-numeric ids for PUT/DELETE are not valid resources
+            pytest.param(
+                "PUT", "/squirrels/abc", {"name": "X", "size": "Y"},
+                id="put_alpha_id",
+            ),
+            pytest.param("DELETE", "/squirrels/abc", None, id="delete_alpha_id"),
+        ],
+    )
+    def it_404s(base_url, http, method, path, data):
+        r = http.request(method, f"{base_url}{path}", data=data)
+        assert r.status_code == 404
+
+    def it_treats_trailing_slash_as_index(squirrels_url, http):
+        # /squirrels/ behaves like /squirrels (index) in this server
+        r1 = http.get(squirrels_url)
+        r2 = http.get(f"{squirrels_url}/")
+        assert r2.status_code == 200
+        assert r2.headers.get("Content-Type") == "application/json"
+        assert r2.json() == r1.json()
+
+    def it_ignores_query_string_on_index(squirrels_url, http):
+        # A query string does not change which resource is addressed
+        r = http.get(f"{squirrels_url}?sort=name")
+        assert r.status_code == 200
+        assert r.json() == []
+
+    def it_takes_id_from_first_segment_after_resource(squirrels_url, http, create_squirrel):
+        # Segments after the id are ignored when extracting it
+        sid = create_squirrel("Deep", "small")
+        r = http.get(f"{squirrels_url}/{sid}/extra")
+        assert r.status_code == 200
+        assert r.json()["name"] == "Deep"
+
     # ---------------- Happy-path core endpoints ----------------
 
-    def it_lists_initially_empty(base_url):
+    def it_lists_initially_empty(squirrels_url, http):
         # GET /squirrels should return 200 + empty JSON array on a clean DB
-        r = requests.get(f"{base_url}/squirrels")
+        r = http.get(squirrels_url)
         assert r.status_code == 200
         assert r.headers.get("Content-Type") == "application/json"
         assert r.json() == []
 
-    def it_creates_and_then_retrieves_a_record(base_url):
+    def it_creates_and_then_retrieves_a_record(squirrels_url, http):
         # POST /squirrels creates a record; we then list to discover its id (black-box)
-        r = requests.post(
-            f"{base_url}/squirrels",
+        r = http.post(
+            squirrels_url,
             data={"name": "Chip", "size": "small"},
         )
         # Starter server uses 201 Created; 200 would also be acceptable success.
         assert r.status_code in (200, 201)
 
-        r = requests.get(f"{base_url}/squirrels")  # index reveals the new id
+        r = http.get(squirrels_url)  # index reveals the new id
         rows = r.json()
         assert len(rows) == 1
         new_id = rows[0]["id"]
 
         # GET /squirrels/{id} returns the persisted record
-        r = requests.get(f"{base_url}/squirrels/{new_id}")
+        r = http.get(f"{squirrels_url}/{new_id}")
         assert r.status_code == 200
         rec = r.json()
         assert rec["name"] == "Chip"
         assert rec["size"] == "small"
 
-    def it_updates_then_reads_back_changes(base_url):
+    def it_updates_then_reads_back_changes(squirrels_url, http, create_squirrel):
         # POST to create, PUT to update, then GET to verify side effect
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "Dale", "size": "medium"},
-        )
-        rows = requests.get(f"{base_url}/squirrels").json()
-        sid = rows[0]["id"]
+        sid = create_squirrel("Dale", "medium")
 
-        r = requests.put(
-            f"{base_url}/squirrels/{sid}",
+        r = http.put(
+            f"{squirrels_url}/{sid}",
             data={"name": "Dale", "size": "large"},
         )
         # Starter server uses 204 No Content for successful update.
         assert r.status_code in (200, 204)
 
-        rec = requests.get(f"{base_url}/squirrels/{sid}").json()
+        rec = http.get(f"{squirrels_url}/{sid}").json()
         assert rec["size"] == "large"
 
-    def it_deletes_then_cannot_be_retrieved(base_url):
+    def it_deletes_then_cannot_be_retrieved(squirrels_url, http, create_squirrel):
         # Create → Delete → Verify GET returns 404
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "Nuts", "size": "tiny"},
-        )
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
+        sid = create_squirrel("Nuts", "tiny")
 
-        r = requests.delete(f"{base_url}/squirrels/{sid}")
+        r = http.delete(f"{squirrels_url}/{sid}")
         # Starter server uses 204 No Content for successful delete.
         assert r.status_code in (200, 204)
 
-        r = requests.get(f"{base_url}/squirrels/{sid}")
-        assert r.status_code == 404
-
-    # ---------------- Ten+ distinct 404 (failure) conditions ----------------
-
-    def it_404s_on_unknown_root(base_url):
-        # Non-existent root path
-        r = requests.get(f"{base_url}/")
-        assert r.status_code == 404
-
-    def it_404s_on_unknown_resource(base_url):
-        # Unknown resource segment
-        r = requests.get(f"{base_url}/not-squirrels")
-        assert r.status_code == 404
-
-    def it_404s_on_retrieve_nonexistent_numeric_id(base_url):
-        # Numeric id that does not exist
-        r = requests.get(f"{base_url}/squirrels/999999")
-        assert r.status_code == 404
-
-    def it_404s_on_retrieve_non_numeric_id(base_url):
-        # Non-numeric id is treated as not found
-        r = requests.get(f"{base_url}/squirrels/abc")
-        assert r.status_code == 404
-
-    def it_treats_trailing_slash_as_index(base_url):
-        # /squirrels/ behaves like /squirrels (index) in this server
-        r1 = requests.get(f"{base_url}/squirrels")
-        r2 = requests.get(f"{base_url}/squirrels/")
-        assert r2.status_code == 200
-        assert r2.headers.get("Content-Type") == "application/json"
-        assert r2.json() == r1.json()
-
-    def it_404s_on_post_with_id_in_path(base_url):
-        # POST with an id in the path is invalid for this API
-        r = requests.post(
-            f"{base_url}/squirrels/123",
-            data={"name": "X", "size": "Y"},
-        )
-        assert r.status_code == 404
-
-    def it_404s_on_put_without_id(base_url):
-        # PUT requires an id path segment
-        r = requests.put(
-            f"{base_url}/squirrels",
-            data={"name": "X", "size": "Y"},
-        )
-        assert r.status_code == 404
-
-    def it_404s_on_delete_without_id(base_url):
-        # DELETE requires an id path segment
-        r = requests.delete(f"{base_url}/squirrels")
-        assert r.status_code == 404
-
-    def it_404s_on_put_nonexistent_id(base_url):
-        # Updating a missing id
-        r = requests.put(
-            f"{base_url}/squirrels/424242",
-            data={"name": "Nope", "size": "Nope"},
-        )
-        assert r.status_code == 404
-
-    def it_404s_on_delete_nonexistent_id(base_url):
-        # Deleting a missing id
-        r = requests.delete(f"{base_url}/squirrels/424242")
-        assert r.status_code == 404
-
-    def it_404s_on_favicon(base_url):
-        # Common stray path
-        r = requests.get(f"{base_url}/favicon.ico")
+        r = http.get(f"{squirrels_url}/{sid}")
         assert r.status_code == 404
 
     # ---------------- Output/side-effect polish ----------------
 
-    def it_returns_json_content_type_on_gets(base_url):
-        # GET endpoints should advertise JSON
-        r = requests.get(f"{base_url}/squirrels")
+    def it_returns_json_content_type_on_gets(squirrels_url, http, seeded_squirrel):
+        # GET endpoints should advertise JSON; the index is already covered by
+        # it_lists_initially_empty, so check retrieving a single record
+        r = http.get(f"{squirrels_url}/{seeded_squirrel['id']}")
         assert r.status_code == 200
         assert r.headers.get("Content-Type") == "application/json"
 
-    def it_201_has_empty_body_and_204_has_no_body(base_url):
+    def it_sends_content_length_matching_json_body(squirrels_url, http):
+        # JSON responses are sized up front rather than delimited by closing
+        create_many(http, squirrels_url, ["Len0", "Len1", "Len2"])
+        r = http.get(squirrels_url)
+        assert r.status_code == 200
+        assert int(r.headers["Content-Length"]) == len(r.content)
+
+        sid = r.json()[0]["id"]
+        r = http.get(f"{squirrels_url}/{sid}")
+        assert int(r.headers["Content-Length"]) == len(r.content)
+
+    def it_201_has_empty_body_and_204_has_no_body(base_url, squirrels_url, http):
         # Starter server uses 201 for create; body is empty string.
-        r = requests.post(
-            f"{base_url}/squirrels",
+        r = http.post(
+            squirrels_url,
             data={"name": "A", "size": "small"},
         )
-        assert r.status_code in (200, 201)
-        # Some implementations send an empty body, some may echo JSON.
-        # Just assert it doesn't crash and is not an error.
-        assert r.status_code < 400
+        assert r.status_code == 201
+        assert r.content == b""
+        assert "Location" in r.headers
 
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
-        r = requests.put(
-            f"{base_url}/squirrels/{sid}",
+        # The Location header names the new record, so no index lookup is needed
+        r = http.put(
+            f"{base_url}{r.headers['Location']}",
             data={"name": "A", "size": "medium"},
         )
         assert r.status_code in (200, 204)
 
-    def it_index_is_sorted_by_id(base_url):
+    def it_sets_location_header_on_create(base_url, squirrels_url, http):
+        # 201 responses point at the newly created record
+        r = http.post(
+            squirrels_url,
+            data={"name": "Loc", "size": "small"},
+        )
+        assert r.status_code == 201
+        location = r.headers.get("Location")
+        assert location is not None
+
+        rec = http.get(f"{base_url}{location}").json()
+        assert rec["name"] == "Loc"
+        assert location == f"/squirrels/{rec['id']}"
+
+    def it_index_is_sorted_by_id(squirrels_url, http):
         # Index is ordered by id ascending (server uses ORDER BY id)
-        for i in range(3):
-            requests.post(
-                f"{base_url}/squirrels",
-                data={"name": f"N{i}", "size": "s"},
-            )
-        rows = requests.get(f"{base_url}/squirrels").json()
+        create_many(http, squirrels_url, ["N0", "N1", "N2"])
+        rows = http.get(squirrels_url).json()
         ids = [row["id"] for row in rows]
         assert ids == sorted(ids)
 
-    def it_update_does_not_change_row_count(base_url):
+    def it_update_does_not_change_row_count(squirrels_url, http, seeded_squirrel):
         # PUT should not add rows
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "E", "size": "s"},
-        )
-        before = len(requests.get(f"{base_url}/squirrels").json())
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
-        requests.put(
-            f"{base_url}/squirrels/{sid}",
+        sid = seeded_squirrel["id"]
+        before = len(http.get(squirrels_url).json())
+        http.put(
+            f"{squirrels_url}/{sid}",
             data={"name": "E2", "size": "m"},
         )
-        after = len(requests.get(f"{base_url}/squirrels").json())
+        after = len(http.get(squirrels_url).json())
         assert after == before
 
-    def it_delete_reduces_row_count(base_url):
+    def it_delete_reduces_row_count(squirrels_url, http, seeded_squirrel, create_squirrel):
         # DELETE should remove exactly one row
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "A", "size": "s"},
-        )
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "B", "size": "m"},
-        )
-        before = len(requests.get(f"{base_url}/squirrels").json())
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
-        requests.delete(f"{base_url}/squirrels/{sid}")
-        after = len(requests.get(f"{base_url}/squirrels").json())
+        sid = seeded_squirrel["id"]
+        create_squirrel("B", "m")
+        before = len(http.get(squirrels_url).json())
+        http.delete(f"{squirrels_url}/{sid}")
+        after = len(http.get(squirrels_url).json())
         assert after == before - 1
 
-    def it_alpha_ids_for_put_and_delete_404(base_url):
-        # Non-numeric ids for PUT/DELETE are not valid resources
-        assert (
-            requests.put(
-                f"{base_url}/squirrels/abc",
-                data={"name": "X", "size": "Y"},
-            ).status_code
-            == 404
+    @pytest.mark.parametrize(
+        "path",
+        ["", "/{id}"],
+        ids=["collection", "single_resource"],
+    )
+    def it_405s_on_patch(squirrels_url, http, seeded_squirrel, path):
+        # PATCH is not supported on the collection or on a single record,
+        # and it must not modify the record
+        url = squirrels_url + path.format(id=seeded_squirrel["id"])
+        r = http.patch(url, data={"name": "Patched"})
+        assert r.status_code == 405
+
+        rec = http.get(f"{squirrels_url}/{seeded_squirrel['id']}").json()
+        assert rec["name"] == seeded_squirrel["name"]
+
+    def it_keeps_connection_usable_after_ignored_body(squirrels_url, http):
+        # The server consumes bodies it does not need, so the next request on
+        # the same keep-alive connection is still parsed correctly
+        r = http.patch(
+            squirrels_url,
+            data={"name": "X", "size": "Y"},
         )
-        assert requests.delete(f"{base_url}/squirrels/abc").status_code == 404
-
-    # ---------------- Bad-input / malformed body behavior ----------------
-
-    def it_fails_on_create_missing_size(base_url):
-        """
-        POST with incomplete data (missing size) should not succeed.
-        The starter server actually raises KeyError and may close the connection;
-        we treat either a 4xx/5xx response or a requests.ConnectionError as failure.
-        """
-        try:
-            r = requests.post(
-                f"{base_url}/squirrels",
-                data={"name": "OnlyName"},
-                timeout=2,
-            )
-        except requests.exceptions.RequestException:
-            # Server closed connection / protocol error => clearly not a success.
-            return
-
-        assert r.status_code >= 400
+        assert r.status_code == 405
+        assert r.headers.get("Connection") != "close"
 
-    def it_fails_on_create_missing_name(base_url):
-        try:
-            r = requests.post(
-                f"{base_url}/squirrels",
-                data={"size": "medium"},
-                timeout=2,
-            )
-        except requests.exceptions.RequestException:
-            return
-
-        assert r.status_code >= 400
+        r = http.get(squirrels_url)
+        assert r.status_code == 200
+        assert r.json() == []
 
-    def it_fails_on_create_empty_fields(base_url):
-        try:
-            r = requests.post(
-                f"{base_url}/squirrels",
-                data={"name": "", "size": ""},
-                timeout=2,
-            )
-        except requests.exceptions.RequestException:
-            return
+    def it_sends_100_continue_before_the_body(base_url, squirrels_url, http):
+        # A client that sends "Expect: 100-continue" waits for the interim
+        # response before sending its body, so it must arrive on its own
+        body = b"name=Cont&size=small"
+        with expect_continue(base_url, len(body)) as sock:
+            assert sock.recv(1024).startswith(b"HTTP/1.1 100")
 
-        # Either validation failure (4xx) or server error (5xx) – both are "bad".
-        assert r.status_code >= 400
+            sock.sendall(body)
+            assert b" 201 " in sock.recv(1024)
 
-    def it_fails_on_update_missing_fields(base_url):
-        # Create a valid record first
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "Valid", "size": "medium"},
-        )
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
+        assert [row["name"] for row in http.get(squirrels_url).json()] == ["Cont"]
 
-        try:
-            r = requests.put(
-                f"{base_url}/squirrels/{sid}",
-                data={"name": "NewName"},  # missing size
-                timeout=2,
-            )
-        except requests.exceptions.RequestException:
-            return
+    def it_refuses_oversized_body_instead_of_sending_100(base_url, squirrels_url, http):
+        # A body the server would not read is refused before it is uploaded
+        with expect_continue(base_url, 10 * 1024 * 1024) as sock:
+            reply = sock.recv(1024)
+        assert reply.startswith(b"HTTP/1.1 400")
+        assert b"Connection: close" in reply
+        assert http.get(squirrels_url).json() == []
 
-        assert r.status_code >= 400
+    # ---------------- Record lifecycle ----------------
 
-    def it_can_create_new_record_after_delete(base_url):
+    def it_can_create_new_record_after_delete(squirrels_url, http):
         """
         After deleting a record, a new record can be created cleanly.
 
@@ -289,78 +312,50 @@ def describe_squirrel_api():
           - the new record exists with the new data
         """
         # Create first record
-        requests.post(
-            f"{base_url}/squirrels",
+        http.post(
+            squirrels_url,
             data={"name": "A", "size": "s"},
         )
-        rows = requests.get(f"{base_url}/squirrels").json()
+        rows = http.get(squirrels_url).json()
         assert len(rows) == 1
         first_id = rows[0]["id"]
 
         # Delete it
-        requests.delete(f"{base_url}/squirrels/{first_id}")
-        rows_after_delete = requests.get(f"{base_url}/squirrels").json()
-        assert all(row["id"] != first_id for row in rows_after_delete)
+        r = http.delete(f"{squirrels_url}/{first_id}")
+        assert r.status_code in (200, 204)
 
         # Create a new record
-        requests.post(
-            f"{base_url}/squirrels",
+        http.post(
+            squirrels_url,
             data={"name": "B", "size": "m"},
         )
-        new_rows = requests.get(f"{base_url}/squirrels").json()
-        # There should be exactly one record and it should be "B"
+        new_rows = http.get(squirrels_url).json()
+        # There should be exactly one record and it should be "B", which also
+        # shows the old record is gone
         assert len(new_rows) == 1
         new_rec = new_rows[0]
         assert new_rec["name"] == "B"
         assert new_rec["size"] == "m"
 
-    def it_second_delete_on_same_id_yields_404(base_url):
-        requests.post(
-            f"{base_url}/squirrels",
-            data={"name": "Once", "size": "m"},
-        )
-        sid = requests.get(f"{base_url}/squirrels").json()[0]["id"]
+    def it_second_delete_on_same_id_yields_404(squirrels_url, http, create_squirrel):
+        sid = create_squirrel("Once", "m")
 
-        first = requests.delete(f"{base_url}/squirrels/{sid}")
+        first = http.delete(f"{squirrels_url}/{sid}")
         assert first.status_code in (200, 204)
 
-        second = requests.delete(f"{base_url}/squirrels/{sid}")
+        second = http.delete(f"{squirrels_url}/{sid}")
         assert second.status_code == 404
 
-    def it_accepts_plaintext_form_body(base_url):
+    def it_accepts_plaintext_form_body(squirrels_url, http):
         # Normal form-encoded body is what the server expects; this should succeed.
-        r = requests.post(
-            f"{base_url}/squirrels",
+        r = http.post(
+            squirrels_url,
             data="name=Plain&size=small",
             headers={"Content-Type": "application/x-www-form-urlencoded"},
         )
         assert r.status_code < 400
 
-    def it_fails_on_unparseable_body_and_keeps_db_empty(base_url):
-        """
-        Send a body that cannot be parsed as form data.
-
-        The starter server will likely error out and may close the connection;
-        we verify that it does NOT create any rows as a side-effect.
-        """
-        try:
-            r = requests.post(
-                f"{base_url}/squirrels",
-                data="this is not=valid&form",
-                headers={"Content-Type": "text/plain"},
-                timeout=2,
-            )
-            # If a response is returned, it should not be a success.
-            assert r.status_code >= 400
-        except requests.exceptions.RequestException:
-            # Connection error also counts as failure.
-            pass
-
-        # DB should still be empty
-        rows = requests.get(f"{base_url}/squirrels").json()
-        assert rows == []
-
-    def it_supports_create_update_delete_lifecycle(base_url):
+    def it_supports_create_update_delete_lifecycle(squirrels_url, http):
         """
         End-to-end lifecycle:
         - create a record
@@ -370,25 +365,117 @@ def describe_squirrel_api():
         - verify it is gone
         """
         # Create
-        requests.post(
-            f"{base_url}/squirrels",
+        http.post(
+            squirrels_url,
             data={"name": "Life", "size": "small"},
         )
-        rows = requests.get(f"{base_url}/squirrels").json()
+        rows = http.get(squirrels_url).json()
         assert len(rows) == 1
         sid = rows[0]["id"]
 
         # Update
-        requests.put(
-            f"{base_url}/squirrels/{sid}",
+        http.put(
+            f"{squirrels_url}/{sid}",
             data={"name": "Life2", "size": "medium"},
         )
-        rec = requests.get(f"{base_url}/squirrels/{sid}").json()
+        rec = http.get(f"{squirrels_url}/{sid}").json()
         assert rec["name"] == "Life2"
         assert rec["size"] == "medium"
 
         # Delete
-        requests.delete(f"{base_url}/squirrels/{sid}")
-        r = requests.get(f"{base_url}/squirrels/{sid}")
+        http.delete(f"{squirrels_url}/{sid}")
+        r = http.get(f"{squirrels_url}/{sid}")
         assert r.status_code == 404
-        assert requests.get(f"{base_url}/squirrels").json() == []
+        assert http.get(squirrels_url).json() == []
+
+    # ---------------- Bad-input / malformed body behavior ----------------
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"name": "OnlyName"},
+            {"size": "medium"},
+            {"name": "", "size": ""},
+            {"name": "", "size": "small"},
+            {"name": "X", "size": ""},
+        ],
+        ids=["missing_size", "missing_name", "empty_fields", "empty_name", "empty_size"],
+    )
+    def it_400s_on_bad_create(squirrels_url, http, data):
+        # POST with a missing or empty name/size is rejected by validation.
+        r = http.post(squirrels_url, data=data, timeout=_FAIL_TIMEOUT)
+        assert r.status_code == 400
+        assert http.get(squirrels_url).json() == []
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {"name": "NewName"},
+            {"size": "large"},
+            {"name": "", "size": ""},
+        ],
+        ids=["missing_size", "missing_name", "empty_fields"],
+    )
+    def it_400s_on_bad_update(squirrels_url, http, seeded_squirrel, data):
+        # PUT with a missing or empty name/size is rejected and changes nothing.
+        url = f"{squirrels_url}/{seeded_squirrel['id']}"
+        r = http.put(url, data=data, timeout=_FAIL_TIMEOUT)
+        assert r.status_code == 400
+        assert http.get(url).json() == seeded_squirrel
+
+    def it_400s_on_invalid_utf8_percent_escape(squirrels_url, http, seeded_squirrel):
+        # %FF is not UTF-8; it is rejected rather than stored as U+FFFD
+        url = f"{squirrels_url}/{seeded_squirrel['id']}"
+        r = http.put(
+            url,
+            data="name=%FF&size=small",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=_FAIL_TIMEOUT,
+        )
+        assert r.status_code == 400
+        assert http.get(url).json() == seeded_squirrel
+
+    def it_400s_on_bad_update_before_looking_up_id(squirrels_url, http):
+        # The body is validated first, so a bad body to a missing id is a 400
+        r = http.put(
+            f"{squirrels_url}/424242",
+            data={"name": "X"},
+            timeout=_FAIL_TIMEOUT,
+        )
+        assert r.status_code == 400
+
+    def it_fails_on_unparseable_body_and_keeps_db_empty(squirrels_url, http):
+        """
+        Send a body that cannot be parsed as form data.
+
+        The server rejects it instead of dropping the connection; we also
+        verify that it does NOT create any rows as a side-effect.
+        """
+        r = http.post(
+            squirrels_url,
+            data="this is not=valid&form",
+            headers={"Content-Type": "text/plain"},
+            timeout=_FAIL_TIMEOUT,
+        )
+        assert r.status_code >= 400
+
+        # DB should still be empty
+        rows = http.get(squirrels_url).json()
+        assert rows == []
+
+    def it_fails_on_oversized_body_and_keeps_db_empty(squirrels_url, http):
+        # Bodies above the server's size cap are rejected without being stored.
+        # The server leaves such a body unread, so the socket cannot be reused.
+        try:
+            r = http.post(
+                squirrels_url,
+                data={"name": "Big" * 30000, "size": "huge"},
+                headers={"Connection": "close"},
+                timeout=_FAIL_TIMEOUT,
+            )
+        except RequestException:
+            r = None
+
+        if r is not None:
+            assert r.status_code >= 400
+        assert http.get(squirrels_url).json() == []